@@ -10,6 +10,62 @@ The implementation could be simpler using only Python variables but it shows
 that functions and variables can flow from Python to Gnuplot and vice-versa
 
 """
+
+import os
+import sys
+import hashlib
+
+# Gnuplot expressions of the verse, they are evaluated by gnuplot at each
+# iteration
+# We use a ternary operator to decide what to do next ;-)
+ACTION = ('(bottles != 0) ? "Take one down and pass it around":'
+          '"Go to the store and buy some more"')
+# On the second line the modulo trick is used to wrap around the number of
+# bottles
+LABEL1 = ('sprintf("%s %s of beer on the wall, %s %s of beer.\\n", '
+          'number(bottles,1), bottles(bottles), number(bottles,0), '
+          'bottles(bottles))')
+LABEL2 = ('action . ", " . sprintf("%s %s of beer on the wall.", '
+          'number((bottles + max) % (max + 1), 0), bottles(bottles-1))')
+# The whole song as a single gnuplot command, the loop is run by gnuplot itself
+SONG = ('do for [b=max:0:-1] { '
+            'bottles = b; '
+            'action = ' + ACTION + '; '
+            'Label1 = ' + LABEL1 + '; '
+            'Label2 = ' + LABEL2 + '; '
+            'set xlabel Label1.Label2 offset 0,-1; '
+            'set samples bottles+2; '
+            'plot 1 with impulses linetype 6 '
+        '}')
+
+
+def cache_path(*key):
+    """Return the path of the file caching the song sung for `key`"""
+    digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+    return os.path.join(os.path.expanduser('~'), '.cache', 'newplot',
+                        '99bottles-%s.txt' % digest)
+
+
+def render_verse(bottles, max_bottles, width=104):
+    """Render a verse like the dumb terminal does, without gnuplot"""
+    def number(b, c):
+        return str(b) if b > 0 else 'nN'[c] + 'o more'
+    def plural(b):
+        return 'bottle' + ('s' if b != 1 else '')
+    action = 'Take one down and pass it around' if bottles != 0 \
+             else 'Go to the store and buy some more'
+    label1 = '%s %s of beer on the wall, %s %s of beer.' % \
+             (number(bottles, 1), plural(bottles),
+              number(bottles, 0), plural(bottles))
+    left = (bottles + max_bottles) % (max_bottles + 1)
+    label2 = '%s, %s %s of beer on the wall.' % \
+             (action, number(left, 0), plural(left))
+    shelf = '|' + ('&' * bottles).ljust(99) + '|'
+    border = '+' + '-' * 99 + '+'
+    return '\n'.join(line.center(width).rstrip() for line in
+                     ('99 bottles song', shelf, border, label1, label2))
+
+
 if __name__ == '__main__':
 
     import argparse
@@ -19,70 +75,106 @@ if __name__ == '__main__':
                                      ' http://gnuplot.info/scripts/99bottles.gp')
     parser.add_argument('max_bottles', type=int, default=99,
                         help='Maximum number of bottles')
+    parser.add_argument('--native', action='store_true',
+                        help='Let gnuplot loop over the verses with a single '
+                        'command')
+    parser.add_argument('--cache', action='store_true',
+                        help='Reuse the song sung by a previous run with the '
+                        'same arguments')
+    parser.add_argument('--pure', action='store_true',
+                        help='Render the verses in Python without starting '
+                        'gnuplot')
     args = parser.parse_args()
     if args.max_bottles > 99 or args.max_bottles <= 0:
         raise ValueError("This is the 99 bottles song, so 'max_bottles' must be"
                          " in [1:99]")
-    
-    with newplot.Gnuplot() as gp:
-        # Define a maximum number of bottles in case we do not want the whole
-        # song.
-        gp.vars.max = args.max_bottles
-        # Initialize the plot only once (bottles is undefined on first entry).
-        # Open the "dumb" terminal to generate ascii art
-        # Define the plot layout such that there are 99 character slots for
-        # bottles, leaving room for a margin and a shelf-divider at each end.
-        fig = gp.Figure(title='99 bottles song', term='dumb',
-                        options=('size 104, 6',))
-        fig.set('xtics', None)
-        fig.set('ytics', None)
-        fig.set('key', None)
-        fig.set('border', '1 front')
-        fig.set('lmargin', 1)
-        fig.set('rmargin', 1)
-        fig.set('xrange', '[0:100]')
-        fig.set('yrange', '[-1:1]')
-        # Create and initialize the bottles counter
-        gp.vars.bottles = gp.vars.max
-        # String valued function to create the "bottle(s)" string
-        # To decide wether we should a plural 's' a dirty substring trick
-        # is used, but we could always use a ternary operator instead
-        # Note that there is no name conflict with the bottles variable.
-        gp.funs.bottles = gp.function(['b'], '"bottle" . "s"[0:(b != 1)]')
-        # Function which returns the number b or the string "no more" iff b=0.
-        # The case of the first letter can be switched by the parameter c.
-        # Please note that this function can be string or number valued.
-        gp.funs.number = gp.function(['b', 'c'],
-                                     '(b > 0) ? sprintf("%d",b) : '\
-                                                '"nN"[c+1:c+1] . "o more"')
-        while gp.vars.bottles >= 0:
-            # We use a ternary operator to decide what to do next ;-)
-            gp.vars.action = \
-                '(bottles != 0) ? "Take one down and pass it around":'\
-                '"Go to the store and buy some more"'
-            # Write the new verse into a label
-            # On the sceond line the modulo trick is used to wrap around the
-            # number of bottles
-            gp.vars.Label1 = 'sprintf("%s %s of beer on the wall, %s %s of ' \
-                             'beer.\\n", number(bottles,1), bottles(bottles),' \
-                             ' number(bottles,0), bottles(bottles))'
-            gp.vars.Label2 = 'action . ", " . sprintf("%s %s of beer on the ' \
-                             'wall.", number((bottles + max) % (max + 1), 0), '\
-                             'bottles(bottles-1))'
-
-            # Use the verse as a label for the x-axis
-            fig.set('xlabel', 'Label1.Label2', 'offset 0,-1')
 
+    # The song only depends on the arguments and the version of newplot
+    cache = cache_path(args.max_bottles, args.native, args.pure,
+                       newplot.__version__) if args.cache else None
+    if cache and os.path.exists(cache):
+        with open(cache) as f:
+            sys.stdout.write(f.read())
+        sys.exit()
+
+    song = []
+    def sing(verse):
+        print(verse)
+        song.append('%s\n' % verse)
+    
+    if args.pure:
+        # Same layout as the dumb terminal, without the gnuplot round trips
+        for bottles in range(args.max_bottles, -1, -1):
+            sing(render_verse(bottles, args.max_bottles))
+    else:
+        with newplot.Gnuplot() as gp:
+            # Define a maximum number of bottles in case we do not want the
+            # whole song.
+            gp.vars.max = args.max_bottles
+            # Initialize the plot only once (bottles is undefined on first
+            # entry).
+            # Open the "dumb" terminal to generate ascii art
+            # Define the plot layout such that there are 99 character slots
+            # for bottles, leaving room for a margin and a shelf-divider at
+            # each end.
+            fig = gp.Figure(title='99 bottles song', term='dumb',
+                            options=('size 104, 6',))
+            fig.set('xtics', None)
+            fig.set('ytics', None)
+            fig.set('key', None)
+            fig.set('border', '1 front')
+            fig.set('lmargin', 1)
+            fig.set('rmargin', 1)
+            fig.set('xrange', '[0:100]')
+            fig.set('yrange', '[-1:1]')
             # We will use the sampling grid to control how many bottles are
-            # drawn. But the set of samples always includes the two end points,
-            # which we don't want.  So we over-write the endpoints with shelf
-            # dividers.
+            # drawn.  But the set of samples always includes the two end
+            # points, which we don't want.  So we over-write the endpoints with
+            # shelf dividers.
+            # Labels are kept by gnuplot, so they are only set once.
             fig.set('label', '1', '"|" at 0,1 front')
             fig.set('label', '2', '"|" at 100,1 front')
-            
-            # Draw the shelf
-            # In the "dumb" terminal, linetype 6 is an ampersand 
-            fig.set('samples', 'bottles+2')
-            fig.plot('1', _with='impulses linetype 6')
-            print(fig.submit())
-            gp.vars.bottles = gp.vars.bottles - 1
+            # Create and initialize the bottles counter
+            gp.vars.bottles = gp.vars.max
+            # String valued function to create the "bottle(s)" string
+            # To decide wether we should a plural 's' a dirty substring trick
+            # is used, but we could always use a ternary operator instead
+            # Note that there is no name conflict with the bottles variable.
+            gp.funs.bottles = gp.function(['b'], '"bottle" . "s"[0:(b != 1)]')
+            # Function which returns the number b or the string "no more" iff
+            # b=0.
+            # The case of the first letter can be switched by the parameter c.
+            # Please note that this function can be string or number valued.
+            gp.funs.number = gp.function(['b', 'c'],
+                                         '(b > 0) ? sprintf("%d",b) : '\
+                                                    '"nN"[c+1:c+1] . "o more"')
+            if args.native:
+                # Only the terminal is restored once the figure is submitted,
+                # the layout settings are kept by gnuplot for the loop
+                fig.submit()
+                sing(gp.cmd('set term %s %s; %s'
+                            % (fig.term, ' '.join(fig.options), SONG)))
+            else:
+                while gp.vars.bottles >= 0:
+                    # The verse definitions are sent to gnuplot all at once
+                    with gp.batch():
+                        # Write the new verse into a label
+                        gp.vars.action = ACTION
+                        gp.vars.Label1 = LABEL1
+                        gp.vars.Label2 = LABEL2
+
+                    # Use the verse as a label for the x-axis
+                    fig.set('xlabel', 'Label1.Label2', 'offset 0,-1')
+
+                    # Draw the shelf
+                    # In the "dumb" terminal, linetype 6 is an ampersand 
+                    fig.set('samples', 'bottles+2')
+                    fig.plot('1', _with='impulses linetype 6')
+                    sing(fig.submit())
+                    gp.vars.bottles = gp.vars.bottles - 1
+
+    if cache:
+        if not os.path.isdir(os.path.dirname(cache)):
+            os.makedirs(os.path.dirname(cache))
+        with open(cache, 'w') as f:
+            f.write(''.join(song))
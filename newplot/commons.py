@@ -18,35 +18,47 @@
 
 
 from .utils import VOID
-from .platform import map
 
 class UserValue(object):
+    """A type checked value
+
+    The value is read with `get` and written with `set`, calling the instance
+    without argument reads the value, with an argument writes it.
+
+    """
+    __slots__ = ('__name', '__value', '__allowed_types', '__types_msg')
 
     def __init__(self, name, value, allowed_types):
         if not isinstance(name, str):
             raise TypeError("'name' argument must be a string")
+        if isinstance(allowed_types, type):
+            allowed_types = (allowed_types,)
         self.__name = name
-        self.__allowed_types = allowed_types
+        self.__allowed_types = tuple(allowed_types)
+        self.__types_msg = ' or '.join('`' + it.__name__ + '`'
+                                       for it in self.__allowed_types)
         self.__checkType(value)
         self.__value = value
 
     def __checkType(self, value):
         if not isinstance(value, self.__allowed_types):
-            raise TypeError("'{}' value must be of type {}" \
-                            .format(self.__name,
-                                    'or '.join(map(lambda it: \
-                                                       '`' + it.__name__ + '`',
-                                                   self.__allowed_types))))
+            raise TypeError("'%s' value must be of type %s" % \
+                            (self.__name, self.__types_msg))
 
     def name(self):
         return self.__name
 
+    def get(self):
+        return self.__value
+
+    def set(self, value):
+        self.__checkType(value)
+        self.__value = value
+
     def __call__(self, value=VOID):
         if value is VOID:
             return self.__value
-        else:
-            self.__checkType(value)
-            self.__value = value
+        self.set(value)
     
 
 def userVal(self, name, value, allowed_types):
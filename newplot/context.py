@@ -19,8 +19,9 @@
 
 import os
 import itertools
+import contextlib
 
-from .platform import print_function, unicode
+from .multithreading import threading
 from .figure import GnuplotFigure
 from .variable import (GnuplotVariableNamespace, GnuplotFunctionNamespace,
                        GnuplotFunction)
@@ -43,16 +44,30 @@ class GnuplotContext(object):
 
     
     """
+    __slots__ = ('__vars', '__funs', '__batch', '__terminated')
     NO_WAIT = float()
-    __FLUSH_INTERACTIVE = lambda self: ('' for c in os.linesep * 50)
+    __FLUSH_INTERACTIVE = (os.linesep * 50,)
 
     def __init__(self):
         super(GnuplotContext, self).__init__()
-        self.__vars = GnuplotVariableNamespace(self)
-        self.__funs = GnuplotFunctionNamespace(self)
+        # Namespaces are created on first access
+        self.__vars = None
+        self.__funs = None
+        # Each thread batches its own commands
+        self.__batch = threading.local()
+        self.__terminated = False
 
-    vars = property(lambda self: self.__vars)
-    funs = property(lambda self: self.__funs)
+    @property
+    def vars(self):
+        if self.__vars is None:
+            self.__vars = GnuplotVariableNamespace(self)
+        return self.__vars
+
+    @property
+    def funs(self):
+        if self.__funs is None:
+            self.__funs = GnuplotFunctionNamespace(self)
+        return self.__funs
 
     @property
     def isinteractive(self):
@@ -66,12 +81,18 @@ class GnuplotContext(object):
         self.terminate()
         return None
 
-    def __ignoreKwarg(self, key, **kwargs):
-        kwargs.pop(key, True)
+    @property
+    def inbatch(self):
+        """Tells if the current thread is inside a `GnuplotContext.batch`"""
+        return getattr(self.__batch, 'lines', None) is not None
 
     def send(self, lines, **kwargs):
         """Send some lines to Gnuplot for evaluation
 
+        Lines can't be sent directly while the current thread is inside a
+        `GnuplotContext.batch`, they would overtake the buffered commands.
+        Implementations raise a `RuntimeError` then.
+
         :param lines:
             :type: `iterable(str)`
             Lines to send
@@ -86,6 +107,52 @@ class GnuplotContext(object):
         """
         raise NotImplementedError
 
+    @contextlib.contextmanager
+    def batch(self, **kwargs):
+        """Gather the commands issued in a `with` block into a single send
+
+        Every call to `GnuplotContext.cmd` made inside the block is buffered
+        instead of being sent, the buffered lines are then sent at once to
+        Gnuplot when the block exits without error. Nested batches are merged
+        into the outermost one. Batches are per thread, commands issued by
+        other threads meanwhile are sent as usual.
+
+        :param kwargs:
+            :type `mapping`:
+            Optionnal arguments to pass to `GnuplotContext.send` when the batch
+            is sent. A commonly used one is `timeout`.
+
+        ..note::
+            Buffered commands return `None` and their `kwargs` are ignored, so
+            commands whose output is needed must not be issued inside a batch.
+            Figures submitted inside the block are buffered as well, in order.
+            `GnuplotContext.send` raises a `RuntimeError` inside the block,
+            since lines sent directly would overtake the buffered commands.
+
+        Example:
+
+        >>> from .gnuplot import Gnuplot
+        >>> with Gnuplot() as gp:
+        ...     with gp.batch():
+        ...         gp.vars.a = 1
+        ...         gp.vars.b = 2
+        ...         gp.cmd('c = a + b')
+        ...     gp.vars.a
+        ...
+        1
+
+        """
+        if self.inbatch:
+            yield
+            return
+        self.__batch.lines = lines = []
+        try:
+            yield
+        finally:
+            self.__batch.lines = None
+        if lines:
+            self.send(lines, **kwargs)
+
     def cmd(self, cmd, inline_data=(), **kwargs):
         """Send a command for evaluation to gnuplot
 
@@ -136,12 +203,39 @@ class GnuplotContext(object):
 
         """
         # Argument checking
-        if not isinstance(cmd, (str, unicode)):
-            raise TypeError("'cmd' argument must be a string, given '{}'" \
-                            .format(cmd))
-        if not hasattr(inline_data, '__iter__'):
+        if not isinstance(cmd, str):
+            raise TypeError("'cmd' argument must be a string, given '%s'" % \
+                            (cmd,))
+        if isinstance(inline_data, (tuple, list)) and not inline_data:
+            lines = (cmd,)
+        elif hasattr(inline_data, '__iter__'):
+            # Inline data are joined to the command so they are sent at once,
+            # an empty iterable of any type leaves the command alone
+            lines = (os.linesep.join(itertools.chain((cmd,), inline_data)),)
+        else:
             raise TypeError("'inline_data' argument must be an iterable")
-        return self.send(itertools.chain((cmd,), inline_data), **kwargs)
+        batch = getattr(self.__batch, 'lines', None)
+        if batch is not None:
+            batch.extend(lines)
+            return None
+        return self.send(lines, **kwargs)
+
+    def currentTerm(self, **kwargs):
+        """Describe the current Gnuplot terminal
+
+        Gnuplot is asked each time, the terminal can be changed by any command
+        sent to it. No answer is given when called inside a batch.
+
+        :param kwargs:
+            :type `mapping`:
+            Optionnal arguments to pass to `GnuplotContext.cmd` when Gnuplot
+            is asked. A commonly used one is `timeout`.
+
+        :returns:
+            The output of the `show term` command, `None` inside a batch
+
+        """
+        return self.cmd('show term', **kwargs)
 
     def iCmd(self, cmd, *args, **kwargs):
         """Run a Gnuplot interactive command
@@ -178,9 +272,12 @@ class GnuplotContext(object):
         The `fit` ...
 
         """
-        self.__ignoreKwarg('inline_data', **kwargs)
-        return self.cmd(cmd + ' ' + ' '.join(map(str, args)),
-                        inline_data=self.__FLUSH_INTERACTIVE(), **kwargs)
+        kwargs.pop('inline_data', None)
+        if len(args) == 1:
+            cmd += ' ' + str(args[0])
+        elif args:
+            cmd += ' ' + ' '.join(map(str, args))
+        return self.cmd(cmd, inline_data=self.__FLUSH_INTERACTIVE, **kwargs)
 
     def terminate(self):
         """Terminate the current gnuplot context.
@@ -209,9 +306,14 @@ class GnuplotContext(object):
         ...
 
         """
+        if self.__terminated:
+            return
+        self.__terminated = True
         try:
-            self.__vars.clear(timeout=self.NO_WAIT)
-            self.__funs.clear(timeout=self.NO_WAIT)
+            if self.__vars is not None:
+                self.__vars.clear(timeout=self.NO_WAIT)
+            if self.__funs is not None:
+                self.__funs.clear(timeout=self.NO_WAIT)
         except ValueError:
             # The pipe may have already been close : silent the error
             pass
@@ -338,7 +440,7 @@ class GnuplotContext(object):
         ...     gp.cmd('exit', sync=(gp.OSECHO, gp.PRINTERR))
 
         """
-        self.__ignoreKwarg('inline_data', **kwargs)
+        kwargs.pop('inline_data', None)
         res = self.cmd('shell', inline_data=shell_cmds, **kwargs)
         if res:
             # Removes the trailing linesep resulting of empty commands
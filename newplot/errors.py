@@ -17,28 +17,52 @@
 # along with Newplot.  If not, see <http://www.gnu.org/licenses/>.
 
 
-import re
-
 from .multithreading import TimeoutError
 
 
-ERROR_PATTERNS = [
-    re.compile(
-        '(?:gnuplot>\s+(?P<cmd>[^\n]+)\s)?'
-            '(?:\s+\^\n)?'
-            '\s+line\s+(?P<line>[0-9]+):\s+(?P<msg>[^\n]+)\s*$', 
-            re.M + re.S)
-]
+_PROMPT = 'gnuplot>'
+
+
+def _parseErrorLine(text):
+    """Extract the line number and the message of a `line <n>: <msg>` report
+
+    :returns:
+        A `(line, msg)` tuple, or `None` if `text` doesn't hold any report
+
+    """
+    i = text.find('line')
+    while i > -1:
+        if i == 0 or text[i - 1].isspace():
+            num, colon, msg = text[i + 4:].partition(':')
+            if colon and num[:1].isspace() and num.lstrip().isdigit() and \
+               msg[:1].isspace() and msg.strip():
+                return num.lstrip(), msg.lstrip()
+        i = text.find('line', i + 4)
+    return None
 
 
 def parseError(output):
-    for error_pattern in ERROR_PATTERNS:
-        m = re.search(error_pattern, output)
-        if m:
-            fields = ['cmd', 'line', 'msg']
-            return dict(zip(fields, (m.group(field) for field in fields)))
+    # Every error report holds a 'line' marker, most outputs don't
+    marker = output.find('line')
+    if marker < 0:
+        return None
+    # Reports can't start before the command echoed ahead of the marker
+    start = max(output.rfind(_PROMPT, 0, marker), 0)
+    cmd = None
+    for text in output[start:].splitlines():
+        stripped = text.strip()
+        if stripped.startswith(_PROMPT):
+            cmd = text.split(_PROMPT, 1)[1].lstrip() or None
+            continue
+        report = _parseErrorLine(text)
+        if report:
+            return {'cmd': cmd, 'line': report[0], 'msg': report[1]}
+        # The echoed command is only followed by a caret and blank lines
+        if stripped and stripped != '^':
+            cmd = None
     return None
 
+
 class GnuplotTimeoutError(TimeoutError):
 
     def __init__(self, error):
@@ -17,11 +17,12 @@
 # along with Newplot.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import os
 import itertools
+from operator import attrgetter
 
-from .platform import map
-from .multithreading import LockedGenerator
 from .errors import GnuplotError, GnuplotTimeoutError
+from .multithreading import LockedGenerator, FREETHREADED
 from .utils import CallableGenerator
 
 
@@ -77,9 +78,22 @@ class GnuplotFigure(object):
         (Read-write)
     
     """
-    __uniqueId = CallableGenerator(LockedGenerator(itertools.count(0, 1)))
+    __slots__ = ('__context', '__id', '__term', '__title', '__options',
+                 '__output', '__term_line', '__wait_evts', '__needs_term_push',
+                 '__term_setting', '__prologue', '__settings', '__settings_script',
+                 '__plots',
+                 '__splots')
+    # next() on a count is atomic under the GIL, no lock is needed around it
+    __uniqueId = CallableGenerator(LockedGenerator(itertools.count(0, 1))
+                                   if FREETHREADED else itertools.count(0, 1))
     __protected_settings = frozenset(('term', 'terminal', 'title', 'output'))
+    __protected_msg = "'%s' can't be set this way, please use the `title`, " \
+                      "`options` and `output` properties, their setters or " \
+                      "create a new Figure."
     __term_desc_prefix = 'terminal type is '
+    # Plot element options, in the order `__plotElement` unpacks them
+    __element_options = ('_for', 'sampling_range', 'axes', '_with', 'using',
+                         'title')
 
     def __init__(self, context, term=None, id=None, title=None,
                  options=None, output=None):
@@ -87,31 +101,37 @@ class GnuplotFigure(object):
         self.__context = context
         self.__id = id
         self.__term = term
+        # A figure drawing on the current terminal, as is, sends no `set term`
+        # nor `set output` line, the current terminal then needs no saving and
+        # restoring around the figure's commands
+        self.__needs_term_push = bool(term or id or options or output)
         # Infer terminal type from the current terminal
         if not self.__term:
             error_msg = "'term' argument could not be infered, " \
                         "please provide one.\nCause: %s"
             try:
-                term = self.__context.cmd('show term')
-                offset = len(self.__term_desc_prefix)
-                start = term.find(self.__term_desc_prefix)
-                if start > -1:
-                    start += offset
-                    end = term.find(' ', start)
-                    if end > -1:
-                        self.__term = term[start:end]
+                term = self.__context.currentTerm()
+                if term is None:
+                    raise GnuplotError({'msg': error_msg % "no answer"})
+                desc = term.partition(self.__term_desc_prefix)[2].split(None, 1)
+                if desc:
+                    self.__term = desc[0]
                 if not self.__term:
-                    raise GnuplotError(error_msg % term)
+                    raise GnuplotError({'msg': error_msg % term})
 
             except GnuplotTimeoutError as e:
-                raise GnuplotError(error_msg % str(e))
+                raise GnuplotError({'msg': error_msg % e})
 
         self.__title = title
         self.__options = options or ()
         self.__output = output
-        self.__term_line = '{term}{sp}{id}'.format(term=self.__term,
-                                                   sp=' ' if self.__id else '',
-                                                   id=str(self.__id or ''))
+        self.__term_line = self.__term + ' ' + str(self.__id) if self.__id \
+                           else self.__term
+        # Close event of the figure's window, see `GnuplotContext.wait`
+        self.__wait_evts = ((self.__term + ('_' + str(self.__id)
+                                            if self.__id else ''), 'Close'),)
+        self.__term_setting = self.__termSetting()
+        self.__prologue = None
         self.__settings = []
         self.__plots = []
         self.__splots = []
@@ -120,81 +140,124 @@ class GnuplotFigure(object):
     def setTitle(self, title):
         """Sets the title of this figure"""
         self.__title = title
+        self.__prologue = None
         self.__unsafeSet('title', '"' + title + '"')
 
     def setOptions(self, options):
         """Sets the options of this figure"""
         self.__options = options or ()
-        options = ' '.join(map(str, self.__options))
-        self.__unsageSet('term',
-                         '{term}{sp}{options}'.format(term=self.__term_line,
-                                                      sp=' ' if options else '',
-                                                      options=options))
+        self.__prologue = None
+        self.__needs_term_push = True
+        # Options are stringified once, when they are set
+        self.__term_setting = self.__termSetting()
+        self.__settings.append(self.__term_setting)
+        self.__settings_script = None
 
     def setOutput(self, output):
         """Sets the output of this figure"""
         self.__output = output
+        self.__prologue = None
+        self.__needs_term_push = True
         self.__unsafeSet('output', output)
 
-    title = property(lambda self: self.__title, setTitle)
-    options = property(lambda self: self.__options, setOptions)
-    output = property(lambda self: self.__output, setOutput)
-    size = property(lambda self: self.__size)
-    id = property(lambda self: self.__id)
-    term = property(lambda self: self.__term)
+    # Getters are C-level attribute lookups rather than Python lambdas
+    title = property(attrgetter('_GnuplotFigure__title'), setTitle)
+    options = property(attrgetter('_GnuplotFigure__options'), setOptions)
+    output = property(attrgetter('_GnuplotFigure__output'), setOutput)
+    size = property(attrgetter('_GnuplotFigure__size'))
+    id = property(attrgetter('_GnuplotFigure__id'))
+    term = property(attrgetter('_GnuplotFigure__term'))
 
     def set(self, setting, *args):
         if setting in self.__protected_settings:
-            raise TypeError("'%s' can't be set this way, please use the `title`"
-                            ", `options` and `output` properties, their setters"
-                            "or create a new Figure.")
-        self.__unsafeSet(setting, *args)
+            raise TypeError(self.__protected_msg % setting)
+        # Fast path for the common `set <setting> <value>`
+        if len(args) == 1 and args[0] is not None:
+            self.__settings.append('set ' + setting + ' ' + str(args[0]))
+            self.__settings_script = None
+        else:
+            self.__unsafeSet(setting, *args)
 
     def __unsafeSet(self, setting, *args):
-        _args = tuple(itertools.takewhile(lambda arg: not arg is None, args))
-        cmd = 'unset' if len(_args) != len(args) else 'set'
-        _args = (setting,) + _args
-        self.__settings.append('{} {}'.format(cmd, ' '.join(map(str, _args))))
+        # Arguments are kept up to the first None, which means unset
+        _args = []
+        for arg in args:
+            if arg is None:
+                break
+            _args.append(arg if isinstance(arg, str) else str(arg))
+        cmd = 'unset ' if len(_args) != len(args) else 'set '
+        # Most settings take at most one argument, avoid join for them
+        if not _args:
+            line = cmd + setting
+        elif len(_args) == 1:
+            line = cmd + setting + ' ' + _args[0]
+        else:
+            line = cmd + setting + ' ' + ' '.join(_args)
+        self.__settings.append(line)
+        self.__settings_script = None
+
+    def __termSetting(self):
+        options = ' '.join(map(str, self.__options))
+        line = 'set term ' + self.__term_line
+        return line + ' ' + options if options else line
 
     def reset(self):
         self.flush()
-        if self.__options: self.setOptions(self.__options)
-        self.__settings.append('reset')
-        if self.__output: self.setOutput(self.__output)
-        if self.__title: self.setTitle(self.__title)
+        # The prologue only changes with the title, options and output
+        if self.__prologue is None:
+            prologue = [self.__term_setting] if self.__options else []
+            prologue.append('reset')
+            if self.__output:
+                prologue.append('set output ' + str(self.__output))
+            if self.__title:
+                prologue.append('set title "' + self.__title + '"')
+            self.__prologue = tuple(prologue)
+        self.__settings.extend(self.__prologue)
+        self.__settings_script = None
 
     def flush(self, settings=True, plots=True, splots=True):
-        if settings: del self.__settings[:]
-        if plots: del self.__plots[:]
-        if splots: del self.__splots[:]
-
-    def __plotElement(self, i, data, elem_args, global_args):
-        _for = elem_args.pop('_for', global_args.get('_for', None))
-        _range = elem_args.pop('sampling_range',
-                              global_args.get('sampling_range', None))
-        axes = elem_args.pop('axes', global_args.get('axes', None))
-        _with = elem_args.pop('_with', global_args.get('_with', None))
-        using = elem_args.pop('using', global_args.get('using', None))
-        title = elem_args.pop('title', global_args.get('title', None))
-        _for = 'for {} '.format(_for) if (_for and i == 0) else ''
-        _range = 'sample {} '.format(_range) \
-                 if (_range and i == 0 and len(self.__plots) == 0) \
-                    else (_range + ' ' if _range else '')
-        axes = 'axes {} '.format(axes) if axes else ''
-        using = 'using {} '.format(using) if using else ''
-        _with = 'with {} '.format(_with) if _with else ''
-        title = 'title "{}"'.format(title) if title else ''
-        return _for + _range + data + ' ' + axes + using + _with + title
+        if settings:
+            self.__settings = []
+            self.__settings_script = None
+        if plots: self.__plots = []
+        if splots: self.__splots = []
+
+    def __plotElement(self, data, elem_args, global_args, first, leading):
+        pop, get = elem_args.pop, global_args.get
+        _for, _range, axes, _with, using, title = [
+            pop(key, get(key)) for key in self.__element_options]
+        # Only the options actually given end up in the plot element
+        parts = []
+        add = parts.append
+        if _for and first:
+            add('for ' + str(_for))
+        if _range:
+            add('sample ' + str(_range) if leading else str(_range))
+        add(data)
+        if axes:
+            add('axes ' + str(axes))
+        if using:
+            add('using ' + str(using))
+        if _with:
+            add('with ' + str(_with))
+        if title:
+            add('title "' + str(title) + '"')
+        return ' '.join(parts)
 
     def __addPlot(self, plot_list, *datas, **kwargs):
-        iterator = lambda: (i for i in range(len(datas)))
-        plot_list.extend(map(lambda i, data, data_args:
-                             self.__plotElement(i, data, data_args, kwargs),
-                             iterator(),
-                             (datas[i][0] if isinstance(datas[i], tuple) \
-                              else datas[i] for i in iterator()),
-                             (datas[i][1] if isinstance(datas[i], tuple) \
-                              else {} for i in iterator())))
+        if not datas:
+            return
+        element = self.__plotElement
+        # Only the first element may take a 'for' and, when it opens the
+        # command, a 'sample', the others go through a plain loop
+        data = datas[0]
+        plot_list.append(element(data[0], data[1], kwargs, True, not plot_list)
+                         if isinstance(data, tuple) else
+                         element(data, {}, kwargs, True, not plot_list))
+        plot_list.extend([element(data[0], data[1], kwargs, False, False)
+                          if isinstance(data, tuple) else
+                          element(data, {}, kwargs, False, False)
+                          for data in datas[1:]])
 
     def plot(self, *datas, **kwargs):
         self.__addPlot(self.__plots, *datas, **kwargs)
@@ -203,26 +266,45 @@ class GnuplotFigure(object):
         self.__addPlot(self.__splots, *datas, **kwargs)
 
     def wait(self, timeout=None):
-        wait_evt = (self.__term + ('_' + str(self.__id) if self.__id else ''),
-                    'Close')
-        self.__context.wait((wait_evt,), timeout=timeout)
+        self.__context.wait(self.__wait_evts, timeout=timeout)
 
     def submit(self, wait=False, timeout=-1,
                flush_settings=True, flush_plots=True, flush_splots=True,
                reset=False):
+        # Nothing to draw, Gnuplot isn't bothered with a bare term push/pop but
+        # pending events are still waited for
+        if not (self.__settings or self.__plots or self.__splots):
+            if wait: self.wait(wait if not isinstance(wait, bool) else None)
+            if reset: self.reset()
+            return None
         plotLine = ('plot ' + ', '.join(self.__plots),) if self.__plots else ()
         splotLine = ('splot ' + ', '.join(self.__splots),) \
                     if self.__splots else ()
-        self.__context.cmd('set term push', timeout=self.__context.NO_WAIT)
-        self.__unsafeSet('term', self.__term_line)
-        res = None
+        # Settings are joined once and kept until they change, so a figure
+        # resubmitted without flushing them doesn't join them again
+        settings = self.__settings_script
+        if settings is None:
+            settings = self.__settings_script = os.linesep.join(
+                self.__settings + ['set term ' + self.__term_line]
+                if self.__needs_term_push else self.__settings)
+        push, pop = (('set term push',), ('set term pop',)) \
+                    if self.__needs_term_push else ((), ())
+        # The figure's commands are joined so they are written to Gnuplot at
+        # once
+        script = os.linesep.join(itertools.chain(push, (settings,),
+                                                 plotLine, splotLine, pop))
         try:
-            res = self.__context.send(itertools.chain(self.__settings,
-                                                      plotLine, splotLine),
-                                      timeout=timeout)
-            if wait: self.wait(wait if not isinstance(wait, bool) else None)
-            self.flush(flush_settings, flush_plots, flush_splots)
-            if reset: self.reset()
-        finally:
-            self.__context.cmd('set term pop', timeout=self.__context.NO_WAIT)
+            # Inside a batch, the script is buffered with the other commands
+            res = self.__context.cmd(script, timeout=timeout)
+        except GnuplotTimeoutError:
+            # The whole script was written, the pop line reached Gnuplot
+            raise
+        except (OSError, ValueError):
+            # Writing to Gnuplot failed, the pop line may not have reached it
+            if pop:
+                self.__context.cmd(pop[0], timeout=self.__context.NO_WAIT)
+            raise
+        if wait: self.wait(wait if not isinstance(wait, bool) else None)
+        self.flush(flush_settings, flush_plots, flush_splots)
+        if reset: self.reset()
         return res
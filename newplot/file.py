@@ -17,29 +17,42 @@
 # along with Newplot.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import io
 import os
 
-from .platform import map
 from .context import GnuplotContext
 
 
 class GnuplotFile(GnuplotContext):
+    __slots__ = ('__backend', '__encode', '__flush_on_write', 'send')
+    # Large buffers keep big inline data dumps from being written in chunks
+    __BUFFER_SIZE = 1 << 20
 
-    def __init__(self, backend, mode='w+b', encoding='utf-8', **kwargs):
+    def __init__(self, backend, mode='w+b', encoding='utf-8',
+                 flush_on_write=True, **kwargs):
         super(GnuplotFile, self).__init__()
+        if isinstance(backend, (str, int)):
+            kwargs.setdefault('buffering', self.__BUFFER_SIZE)
+            # Binary files don't take an encoding, lines are encoded by `write`
+            if 'b' not in mode:
+                kwargs['encoding'] = encoding
         if isinstance(backend, str):
-            self.__backend = open(backend, mode=mode, encoding=encoding,
-                                  **kwargs)
+            self.__backend = open(backend, mode=mode, **kwargs)
         elif isinstance(backend, int):
-            self.__backend = os.fdopen(backend, mode=mode, encoding=encoding,
-                                       **kwargs)
-        elif not (hasattr(backend, 'write') and \
-                  hasattr(backend, 'flush') and \
-                  hasattr(backend, 'close')):
+            self.__backend = os.fdopen(backend, mode=mode, **kwargs)
+        # Standard streams are file-like, others are probed for the methods
+        # used here
+        elif not (isinstance(backend, io.IOBase) or \
+                  (hasattr(backend, 'write') and \
+                   hasattr(backend, 'flush') and \
+                   hasattr(backend, 'close'))):
             raise TypeError("'backend' argument must be a file-like object, "
                             "given {}".format(backend))
+        elif isinstance(backend, io.RawIOBase):
+            self.__backend = io.BufferedWriter(backend, self.__BUFFER_SIZE)
         else:
             self.__backend = backend
+        self.__flush_on_write = flush_on_write
         if not hasattr(self.__backend, 'encoding'):
             self.__encode = lambda s: s.encode(encoding)
         else:
@@ -58,6 +71,16 @@ class GnuplotFile(GnuplotContext):
         self.__backend.close()
 
     def write(self, lines, **ignored):
-        map(lambda line: self.__backend.write(self.__encode(line + os.linesep)),
-            lines)
-        self.__backend.flush()
+        # Lines sent directly would overtake the commands buffered by a batch
+        if self.inbatch:
+            raise RuntimeError("'send' can't be used inside a batch, "
+                               "use 'cmd' instead")
+        # Lines are joined to be written at once
+        lines = tuple(lines)
+        if lines:
+            self.__backend.write(self.__encode(os.linesep.join(lines) +
+                                               os.linesep))
+        # Without flushing, the buffer is only written when full or when the
+        # file is closed, which suits backends that aren't read live
+        if self.__flush_on_write:
+            self.__backend.flush()
@@ -17,22 +17,29 @@
 # along with Newplot.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import sys
+import queue
+
 from .utils import isnumber, VOID
 
-from .platform import IS_PYTHON2, print_function
-if IS_PYTHON2:
-    import Queue as queue
-    class TimeoutError(OSError):
-        pass
-else:
-    import queue
-    TimeoutError = TimeoutError
+# Exported for the error classes
+TimeoutError = TimeoutError
 
 try:
     import threading
 except ImportError:
     import dummy_threading as threading
 
+try:
+    # Uncontended acquisitions don't need an OS lock with fastrlock
+    from fastrlock.rlock import FastRLock as RLock
+except ImportError:
+    RLock = threading.RLock
+
+# Free-threaded builds (PEP 703) run without the GIL, `next` on a shared
+# iterator isn't atomic anymore there
+FREETHREADED = not getattr(sys, '_is_gil_enabled', lambda: True)()
+
 
 def LockedGenerator(gen):
     """Turn a generator into a thread-safe one
@@ -45,12 +52,13 @@ def LockedGenerator(gen):
         A new generator that protects the use of the given generator with a lock
 
     """
-    lock = threading.RLock()
+    lock = RLock()
+    next_ = gen.__next__
     def locked():
         it = VOID
         while True:
             with lock:
-                it = next(gen)
+                it = next_()
             yield it
     return locked()
 
@@ -61,6 +69,8 @@ class Event(object):
     They provides a convenient wrapper around `threading.Event`
 
     """
+    __slots__ = ('__backend',)
+
     def __init__(self):
         self.__backend = threading.Event()
 
@@ -141,14 +151,17 @@ class Future(object):
         account.
 
     """
+    __slots__ = ('__task', '__abort', '__done', '__lock', '__result', '__call')
+
     def __init__(self, task):
         if not callable(task):
             raise TypeError("'task' argument must be a callable")
         self.__task = task
         self.__abort = Event()
         self.__done = Event()
-        self.__lock = threading.RLock()
+        self.__lock = threading.Lock()
         self.__result = None
+        self.__call = self.__callOnce
 
     def __call__(self, *args, **kwargs):
         """Run the future
@@ -167,7 +180,7 @@ class Future(object):
         """
         self.__call(*args, **kwargs)
 
-    def __call(self, *args, **kwargs):
+    def __callOnce(self, *args, **kwargs):
         with self.__lock:
             self.__call = self.__cantCallTwice
         self.__result = self.__task(self.__abort, *args, **kwargs)
@@ -16,21 +16,17 @@
 # You should have received a copy of the GNU General Public License
 # along with Newplot.  If not, see <http://www.gnu.org/licenses/>.
 
-from .platform import print_function
 
 try:
 
     from numpy import ufunc, zeros, asarray, newaxis, savetxt, shape
+    from numpy import add as vadd
     arraytype = lambda a: a.dtype.char
-    vadd = lambda a, b: a + b
 
 except ImportError:
 
-    import copy
     import warnings
-    from itertools import product
 
-    from .platform import reduce, map
     from .utils import iterable
 
     warnings.warn("Numpy isn't available on this environment, falls back to raw"
@@ -70,10 +66,14 @@ except ImportError:
         """
         if isinstance(shape, int):
             shape = (shape,)
-        res = dtype()
-        for dim in reversed(shape):
-            res = [copy.deepcopy(res) for _ in range(dim)]
-        return res
+        zero = dtype()
+        # Zeros are immutable so the innermost lists can share them, only
+        # the nested lists need to be distinct
+        def fill(dims):
+            if len(dims) == 1:
+                return [zero] * dims[0]
+            return [fill(dims[1:]) for _ in range(dims[0])]
+        return fill(tuple(shape)) if shape else zero
 
     def arraytype(a):
         """Returns the type of an homogeneous array (like numpy `.dtype`)
@@ -183,17 +183,16 @@ except ImportError:
         ()
 
         """
-        if iterable(a):
-            n = 0
-            aaa = None
-            for i, aa in enumerate(a):
-                if aa is not a:
-                    if i == 0:
-                        aaa = aa
-                    n += 1
-            if n > 0:
-                return (n,) + (shape(aaa) if aaa else ())
-        return ()
+        # Only the first element of each dimension is looked at
+        sh = ()
+        while iterable(a) and len(a) > 0:
+            first = next(iter(a))
+            # One character strings are their own first element
+            if first is a:
+                break
+            sh += (len(a),)
+            a = first
+        return sh
 
     def transpose(a, axes=None):
         """An emulation of numpy `transpose` function
@@ -237,31 +236,53 @@ except ImportError:
         >>> transpose([[[0, 1], [2, 3]], [[4, 5], [6, 7]]], (2, 1, 0))
         [[[0, 4], [2, 6]], [[1, 5], [3, 7]]]
 
+        >>> transpose([[1, 2], [3]])
+        Traceback (most recent call last):
+            ...
+        ValueError: 'a' argument must not be ragged, given '[[1, 2], [3]]'
+
         """
         if a:
             sh = shape(a)
+            ndim = len(sh)
             if axes is None:
-                axes = range(len(sh)-1, -1, -1)
-            tr = zeros(tuple((sh[i] for i in axes)), arraytype(a))
-            for coords in product(*(range(i) for i in sh)):
-                # print('coords:', coords)
-                newcoords = tuple((coords[i] for i in axes))
-                # print('newcoords:', newcoords)
-                v = reduce(lambda acc, c: acc[c], coords, a)
-                # print('v:', v)
-                trv = reduce(lambda acc, nc: acc[nc], newcoords[:-1], tr)
-                # print('trv:', trv)
-                trv[newcoords[-1]] = v
-                # print('tr:', tr)
+                axes = range(ndim - 1, -1, -1)
+            new_sh = [sh[i] for i in axes]
+            # Work on flat lists, the source one is in row-major order. The
+            # shape only looks at first elements, every sub-array is checked
+            # against it so ragged arrays aren't silently truncated
+            flat = [a]
+            for n in sh:
+                for sub in flat:
+                    if len(sub) != n:
+                        raise ValueError("'a' argument must not be ragged, "
+                                         "given '%s'" % (a,))
+                flat = [aa for sub in flat for aa in sub]
+            # Destination stride of each source axis
+            strides = [0] * ndim
+            stride = 1
+            for k in range(ndim - 1, -1, -1):
+                strides[axes[k]] = stride
+                stride *= new_sh[k]
+            # Destination offset of every source element, in source order
+            offsets = [0]
+            for i in range(ndim):
+                offsets = [o + j * strides[i]
+                           for o in offsets for j in range(sh[i])]
+            tr = [None] * len(flat)
+            for offset, v in zip(offsets, flat):
+                tr[offset] = v
+            for n in reversed(new_sh[1:]):
+                tr = [tr[i:i + n] for i in range(0, len(tr), n)]
             return tr
         return list(a)
 
     def savetxt(fname, X, fmt='%.18e', delimiter=' ', newline='\n', footer='',
                 comments='# ', encoding=None):
-        mode = 'wb' if encoding else 'w'
-        encode = lambda s: s.encode(encoding) if encoding \
-                 else lambda s: s
-        with open(fname, mode, encoding=encoding, newline=newline) as f:
-            map(lambda l:
-                    f.write(encode(delimiter.join(map(str, l)) + newline)), X)
+        # Rows are joined and encoded at once, as in numpy the default
+        # encoding is latin1
+        text = newline.join(delimiter.join(map(str, row)) for row in X)
+        with open(fname, 'wb') as f:
+            if text:
+                f.write((text + newline).encode(encoding or 'latin1'))
     
@@ -16,43 +16,18 @@
 # You should have received a copy of the GNU General Public License
 # along with Newplot.  If not, see <http://www.gnu.org/licenses/>.
 
-from __future__ import print_function
-
 import sys
-import inspect
-import itertools
-import functools
-
-IS_PYTHON2 = sys.version < '3'
-
-# Normalize some function across the different Python version
-if IS_PYTHON2:
-    unicode = unicode
-    map = itertools.imap
-    reduce = reduce
-else:
-    unicode = str
-    map = map
-    reduce = functools.reduce
-_inspect = inspect
-inspect = type('INSPECT', (object,),
-               {'isgenerator': lambda self, fun: _inspect.isgenerator(fun),
-                'getargspec': lambda self, fun: _inspect.getargspec(fun) \
-                                  if IS_PYTHON2 \
-                                  else _inspect.getfullargspec(fun)})()
-
-if sys.platform.startswith('linux'):
-    DEFAULT_GNUPLOT_CMD = 'gnuplot'
-    SHOW_PROMPT = 'printf "[%s@%s:%s]$ " "${USER}" "${HOSTNAME%%.*}" "${PWD/#$HOME/\~}"'
 
-elif sys.platform.startswith('win32') or sys.platform.startswith( 'cli'):
-    DEFAULT_GNUPLOT_CMD = 'wgnuplot_pipes.exe'
-    SHOW_PROMPT = 'echo %PROMPT%'
+_UNIX = ('gnuplot',
+         'printf "[%s@%s:%s]$ " "${USER}" "${HOSTNAME%%.*}" "${PWD/#$HOME/\~}"')
+_WINDOWS = ('wgnuplot_pipes.exe', 'echo %PROMPT%')
 
-elif sys.platform.startswith('cygwin'):
-    DEFAULT_GNUPLOT_CMD = 'wgnuplot_pipes.exe'
-    SHOW_PROMPT = 'echo %PROMPT%'
+# Gnuplot command and prompt, by `sys.platform` prefix
+_PLATFORMS = (('linux', _UNIX), ('darwin', _UNIX), ('win32', _WINDOWS),
+              ('cli', _WINDOWS), ('cygwin', _WINDOWS))
 
-elif sys.platform.startswith('darwin'):
-    DEFAULT_GNUPLOT_CMD = 'gnuplot'
-    SHOW_PROMPT = 'printf "[%s@%s:%s]$ " "${USER}" "${HOSTNAME%%.*}" "${PWD/#$HOME/\~}"'
+for _prefix, (DEFAULT_GNUPLOT_CMD, SHOW_PROMPT) in _PLATFORMS:
+    if sys.platform.startswith(_prefix):
+        break
+else:
+    raise ImportError("Unsupported platform '%s'" % sys.platform)
@@ -19,18 +19,22 @@
 
 import os
 import time
+import select
 import logging
 import itertools
 import subprocess
 
 from .utils import CallableGenerator, NoOp, isnumber
-from .platform import map, DEFAULT_GNUPLOT_CMD, print_function
+from .platform import DEFAULT_GNUPLOT_CMD
 from .context import GnuplotContext
 from .multithreading import (threading, queue, Event, Future,
-                             FutureTimeoutError, LockedGenerator)
+                             FutureTimeoutError, LockedGenerator, FREETHREADED)
 from .errors import GnuplotError, GnuplotTimeoutError, parseError
 
 
+_LINESEP = os.linesep.encode()
+
+
 class _GnuplotOutputReader(threading.Thread):
     """A thread that reads the gnuplot output
 
@@ -38,17 +42,29 @@ class _GnuplotOutputReader(threading.Thread):
     It is not intended to be used by end users
 
     """
+    __BLOCK_SIZE = 4096
+
     def __init__(self, gnuplot_stdout, no_wait, id = 1):
         threading.Thread.__init__(self,
                                   target=self.__run,
                                   name='GnuplotOutputReader-%d' % id)
         self.setDaemon(True)
         self.__input = gnuplot_stdout
-        self.__lock = threading.RLock()
-        self.__doing = set()
+        # Output read past the done token of the previous request
+        self.__pending = b''
+        self.__lock = threading.Lock()
+        # There is a single reader thread, at most one request is in progress
+        self.__doing = None
         self.__requests = queue.Queue()
         self.__stop = Event()
         self.__NO_WAIT = no_wait
+        # On POSIX, a pipe wakes the reader up when its request is aborted
+        # while it waits for output. Windows can't select on pipes, aborting
+        # is then only noticed between two reads.
+        if os.name == 'posix':
+            self.__wakeup_r, self.__wakeup_w = os.pipe()
+        else:
+            self.__wakeup_r = self.__wakeup_w = None
 
     def stop(self):
         if not self.__stop():
@@ -60,10 +76,16 @@ class _GnuplotOutputReader(threading.Thread):
                 todo.abort()
             # Put None in the queue in case it is blocked in get()
             self.__requests.put(None)
-            # Purge the doing set
-            with self.__lock:
-                while len(self.__doing) > 0:
-                    self.__doing.pop().abort()
+            # Abort the request in progress
+            doing = self.__doing
+            if doing is not None:
+                doing.abort()
+            self.__wakeUp()
+
+    def __wakeUp(self):
+        with self.__lock:
+            if self.__wakeup_w is not None:
+                os.write(self.__wakeup_w, b'!')
 
     def requestOutput(self, cause, beginToken, doneToken, timeout = None):
         if timeout == self.__NO_WAIT:
@@ -74,27 +96,51 @@ class _GnuplotOutputReader(threading.Thread):
             return future.waitDone(timeout)
         except FutureTimeoutError:
             future.abort()
+            self.__wakeUp()
         raise GnuplotTimeoutError({'cause': cause, 'timeout': timeout})
 
     def __consumeUntilDone(self, abort, beginToken, doneToken):
-        def addToBuffer(buf, line):
-            buf += line
-        # Consume the output until the stop token is reached or cancellation
-        buff = ''
+        # Consume the output by blocks until the done token is reached or
+        # cancellation. The input is unbuffered, so a read returns as soon as
+        # some output is available.
         beginToken = beginToken + os.linesep
-        doneToken = doneToken + os.linesep
-        while not (buff.endswith(doneToken) or abort()):
-            c = self.__input.read(1)
-            if c:
-                buff += c.decode(errors='replace')
+        token = doneToken.encode() + _LINESEP
+        # Loop invariants are bound once
+        read, size = self.__input.read, self.__BLOCK_SIZE
+        wakeup = self.__wakeup_r
+        inputs = (self.__input, wakeup)
+        data = bytearray(self.__pending)
+        end = data.find(token)
+        while end < 0 and not abort():
+            if wakeup is not None:
+                if wakeup in select.select(inputs, (), ())[0]:
+                    # Drain the wake up calls, then check for abortion
+                    os.read(wakeup, size)
+                    continue
+            # Only the new block, and the token's possible overlap with the
+            # previous ones, is scanned
+            start = max(0, len(data) - len(token) + 1)
+            block = read(size)
+            if block:
+                data += block
+                end = data.find(token, start)
+        if end < 0:
+            # Aborted, the output read so far is left for the next request
+            self.__pending = bytes(data)
+            return '', ''
+        end += len(token)
+        self.__pending = bytes(data[end:])
+        buff = data[:end].decode(errors='replace')
+        # The output stops before the line break preceding the done token
+        stop = -(len(token) + 1)
         start = buff.find(beginToken)
         if start > -1:
             unsync = ''
             if start > 0:
                 unsync = buff[:start-1]
-            return unsync, buff[start + len(beginToken):-(len(doneToken) + 1)]
+            return unsync, buff[start + len(beginToken):stop]
         else:
-            return '', buff[:-(len(doneToken) + 1)]
+            return '', buff[:stop]
 
     def __run(self):
         while not self.__stop():
@@ -103,20 +149,18 @@ class _GnuplotOutputReader(threading.Thread):
             # Extract it
             if request is not None:
                 todo, beginToken, doneToken = request
-                # Tag it as doing
-                with self.__lock:
-                    self.__doing.add(todo)
-                # Do it
+                # Tag it as doing, a plain assignment needs no lock
+                self.__doing = todo
+                # Do it
                 todo(beginToken, doneToken)
-                # When done untag it
+                # When done untag it
+                self.__doing = None
                 self.__requests.task_done()
-                with self.__lock:
-                    try:
-                        self.__doing.remove(todo)
-                    except KeyError:
-                        # The stop method may have already untag
-                        # this task: the error is ignored
-                        pass
+        with self.__lock:
+            if self.__wakeup_r is not None:
+                os.close(self.__wakeup_r)
+                os.close(self.__wakeup_w)
+                self.__wakeup_r = self.__wakeup_w = None
 
 
 class GnuplotProcess(GnuplotContext):
@@ -160,11 +204,11 @@ class GnuplotProcess(GnuplotContext):
     PRINTERR = "printerr '%s'"
     OSECHO = "echo '%s'"
 
-    __BEGIN_TOKEN_FORMAT = '<newplot-{id}-{cmd_id}>'
-    __DONE_TOKEN_FORMAT = '<newplot-{id}-{cmd_id}-done>'
-    __EVENT_TOKEN = '<newplot-{id}-{event}-{evt_id}>'
+    __EVENT_TOKEN = '<newplot-%d-%s-%d>'
 
-    __uniqueId = CallableGenerator(LockedGenerator(itertools.count(1, 1)))
+    # next() on a count is atomic under the GIL, no lock is needed around it
+    __uniqueId = CallableGenerator(LockedGenerator(itertools.count(1, 1))
+                                   if FREETHREADED else itertools.count(1, 1))
 
     def __init__(self, cmd=DEFAULT_GNUPLOT_CMD,
                        args=(),
@@ -183,15 +227,20 @@ class GnuplotProcess(GnuplotContext):
             raise TypeError("'defaultTimeout' argument must be None or a >= 0 "
                             "number")
         self.id = self.__uniqueId()
-        self.__backend = subprocess.Popen([cmd] + list(map(str, args)),
+        # Synchronization tokens are '<newplot-{id}-{cmd_id}>' and
+        # '<newplot-{id}-{cmd_id}-done>', their constant part is built once
+        self.__token_prefix = '<newplot-%d-' % self.id
+        self.__backend = subprocess.Popen([cmd] + [str(arg) for arg in args],
                                           stdin=subprocess.PIPE,
                                           stdout=subprocess.PIPE,
                                           stderr=subprocess.STDOUT,
                                           bufsize=0)
         self.__stdin = self.__backend.stdin
         self.__stdout = self.__backend.stdout
-        self.__genCmdId = \
-            CallableGenerator(LockedGenerator(itertools.count(0, 1)))
+        cmd_ids = itertools.count(0, 1)
+        self.__genCmdId = CallableGenerator(LockedGenerator(cmd_ids)
+                                            if FREETHREADED else cmd_ids)
+        self.__log = log
         self.__logger = self.__initLogger(log)
         self.__defaultTimeout = defaultTimeout
         self.__reader = _GnuplotOutputReader(self.__stdout,
@@ -244,18 +293,27 @@ class GnuplotProcess(GnuplotContext):
         else:
             return NoOp()
 
-    def __sendLine(self, line):
-        self.__logger.info('Sending `%s`' % line)
-        self.__stdin.write((line + os.linesep).encode())
+    def __sendLines(self, lines):
+        if self.__log:
+            for line in lines:
+                self.__logger.info('Sending `%s`' % line)
+        # Lines are written at once, as the pipe is unbuffered a raw write
+        # may be partial and is then resumed
+        lines.append('')
+        data = memoryview(os.linesep.join(lines).encode())
+        written = self.__stdin.write(data)
+        while written < len(data):
+            written += self.__stdin.write(data[written:])
 
     def __getTimeout(self, timeout):
         if isnumber(timeout) and timeout < 0:
             timeout = self.__defaultTimeout
         return timeout
 
-    __authorized_sync = frozenset((PRINTERR, PRINTERR))
+    __authorized_sync = frozenset((PRINTERR, OSECHO))
+    __DEFAULT_SYNC = (PRINTERR, PRINTERR)
 
-    def send(self, lines, timeout=-1, sync=(PRINTERR, PRINTERR)):
+    def send(self, lines, timeout=-1, sync=__DEFAULT_SYNC):
         """Send lines for evaluation to gnuplot
 
         Lines are sent to gnuplot on stdin and if `timeout` is not 'NO_WAIT`,
@@ -317,42 +375,63 @@ class GnuplotProcess(GnuplotContext):
         ...
         ...
 
+        Inside Gnuplot's `shell`, the begin-token is echoed by the shell and
+        the done-token printed by Gnuplot once the shell exits:
+
+        >>> with GnuplotProcess() as gp:
+        ...     gp.send(('shell',), timeout=gp.NO_WAIT)
+        ...     gp.send(('exit',), sync=(gp.OSECHO, gp.PRINTERR))
+        ...
+
         """
-        if not (hasattr(sync, '__iter__') and len(sync) == 2):
-            raise TypeError("'sync' argument must be a 2-tuple")
-        for _sync in sync:
-            if not _sync in self.__authorized_sync:
-                raise TypeError("'sync' argument must be PRINTERR or OSECHO")
+        # Lines sent directly would overtake the commands buffered by a batch
+        if self.inbatch:
+            raise RuntimeError("'send' can't be used inside a batch, "
+                               "use 'cmd' instead")
+        # The default synchronization is known to be valid
+        if sync is not self.__DEFAULT_SYNC:
+            if not (hasattr(sync, '__iter__') and len(sync) == 2):
+                raise TypeError("'sync' argument must be a 2-tuple")
+            for _sync in sync:
+                if not _sync in self.__authorized_sync:
+                    raise TypeError("'sync' argument must be PRINTERR or "
+                                    "OSECHO")
         timeout = self.__getTimeout(timeout)
-        timeout_is_no_wait = timeout == self.NO_WAIT
+        if timeout == self.NO_WAIT:
+            # Nothing is read back, no synchronization token is needed
+            self.__sendLines(list(lines))
+            self.__stdin.flush()
+            return None
         # Generate uniques begin and done tokens for this command
-        cmd_id = self.__genCmdId()
-        beginToken, doneToken = (form.format(id=self.id, cmd_id=cmd_id) \
-                                 for form in (self.__BEGIN_TOKEN_FORMAT,
-                                              self.__DONE_TOKEN_FORMAT))
-        printBeginToken, printDoneToken = (form % token for (form, token) in \
-                                           zip(sync, (beginToken, doneToken)))
+        token = self.__token_prefix + str(self.__genCmdId())
+        beginToken = token + '>'
+        doneToken = token + '-done>'
         # Send the command, tell gnuplot to print the begin token before,
         # and the done token after:
-        if not timeout_is_no_wait: self.__sendLine(printBeginToken)
-        for line in lines: self.__sendLine(line)
-        if not timeout_is_no_wait: self.__sendLine(printDoneToken)
+        script = [sync[0] % beginToken]
+        script.extend(lines)
+        script.append(sync[1] % doneToken)
+        self.__sendLines(script)
         self.__stdin.flush()
         # Ask for parsing the output during at most timeout seconds
         unsync_result, result = \
             self.__reader.requestOutput('Sending ' + beginToken,
                                         beginToken,
                                         doneToken, timeout)
-        if unsync_result:
-            self.__logger.warning('unsync output: %s' % unsync_result)
-        if result:
-            self.__logger.info('sync output: %s' % result)
-        # Parse for errors
+        if self.__log:
+            if unsync_result:
+                self.__logger.warning('unsync output: %s' % unsync_result)
+            if result:
+                self.__logger.info('sync output: %s' % result)
+        # Most commands don't output anything, only outputs are parsed for
+        # errors
+        if not result:
+            return None
         error = parseError(result)
         if error:
             raise GnuplotError(error)
-        # return the result
-        return result or None
+        # return the result
+        return result
 
     def wait(self, evts=(), timeout=-1):
         """Wait for gnuplot events to happen
@@ -433,31 +512,30 @@ class GnuplotProcess(GnuplotContext):
             # Saves the current terminal
             self.cmd('set term push', timeout=self.NO_WAIT)
             try:
+                current_term = None
                 for (term, evt) in evts:
-                    term_spec = term.split('_')
-                    term_name = term_spec[0]
-                    term_id = int(term_spec[1]) if len(term_spec) > 1 else '' 
                     bind_evt = 'bind ' + evt
                     evt_id = self.__genCmdId()
-                    evt_token = self.__EVENT_TOKEN.format(id=self.id, event=evt,
-                                                          evt_id=evt_id)
-                    bind_cmd = bind_evt + ' {printToken}' \
-                               .format(evt=evt,
-                                       printToken=self.__print('"%s"' % \
-                                                               evt_token))
-                
-                    # Switching to the target terminal window
-                    self.cmd('set term {} {}'.format(term_name, term_id),
-                             timeout=self.NO_WAIT)
-                    # Force it to raise with 'refresh', it's dirty but 'raise'
-                    # is not reliable
-                    self.cmd('refresh', timeout=self.NO_WAIT)
+                    evt_token = self.__EVENT_TOKEN % (self.id, evt, evt_id)
+                    bind_cmd = bind_evt + ' printerr "' + evt_token + '"'
+                    # Switching to the target terminal window, unless the
+                    # previous event was already waited there
+                    if term != current_term:
+                        term_spec = term.split('_')
+                        term_id = int(term_spec[1]) if len(term_spec) > 1 \
+                                  else ''
+                        self.cmd('set term %s %s' % (term_spec[0], term_id),
+                                 timeout=self.NO_WAIT)
+                        # Force it to raise with 'refresh', it's dirty but
+                        # 'raise' is not reliable
+                        self.cmd('refresh', timeout=self.NO_WAIT)
+                        current_term = term
                     # Bind the event
                     self.cmd(bind_cmd, timeout=self.NO_WAIT)
                     try:
                         # Wait for the event token
-                        self.__reader.requestOutput('Waiting for {}({}) event' \
-                                                    .format(evt, evt_id),
+                        self.__reader.requestOutput('Waiting for %s(%d) event'
+                                                    % (evt, evt_id),
                                                     '', evt_token, timeout)
                     finally:
                         # Unbind evt
@@ -17,21 +17,11 @@
 # along with Newplot.  If not, see <http://www.gnu.org/licenses/>.
 
 
-from .platform import IS_PYTHON2
-
-
 VOID = type('VOID', (object,), {})()
 
 def isnumber(obj):
     return isinstance(obj, (int, float))
 
-def isfloat(string):
-    try:
-        float(string)
-        return True
-    except ValueError:
-        return False
-
 def iterable(obj):
     """Check if an object is iterable
 
@@ -57,12 +47,18 @@ def CallableGenerator(gen):
         The `next` method of the given generator
 
     """
-    return gen.next if IS_PYTHON2 else gen.__next__
+    return gen.__next__
 
 class NoOp(object):
+    """An object whose attributes are all the same do-nothing callable"""
+    __slots__ = ()
+
+    @staticmethod
+    def noOp(*args, **kwargs):
+        pass
 
-    def __getattr__(self, name, default=None):
-        return self.noOp
+    def __getattr__(self, name):
+        return NoOp.noOp
 
-    def noOp(self, *args, **kwargs):
+    def __call__(self, *args, **kwargs):
         pass
@@ -17,8 +17,45 @@
 # along with Newplot.  If not, see <http://www.gnu.org/licenses/>.
 
 
-from .utils import isfloat
-from .platform import map, print_function
+import functools
+import sys
+
+from .utils import VOID
+
+
+@functools.lru_cache(maxsize=1024)
+def _parseGnuplotValue(value):
+    """Convert a value printed by Gnuplot to an `int`, a `float` or a `str`
+
+    Results are cached since the same values are often read repeatedly.
+
+    """
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def _formatArgs(args):
+    """Format call arguments as `(arg1, arg2, ...)`
+
+    Arguments are formatted as given, Gnuplot tells `1` and `1.0` apart (the
+    former uses integer arithmetic):
+
+    >>> _formatArgs((1, 1.0, True))
+    '(1, 1.0, True)'
+    >>> _formatArgs((2.0,)), _formatArgs((2,))
+    ('(2.0)', '(2)')
+
+    """
+    if len(args) == 1:
+        return '(' + str(args[0]) + ')'
+    # A list lets `join` size its result up front, unlike a `map` iterator
+    return '(' + ', '.join([str(arg) for arg in args]) + ')'
 
 
 class GnuplotDefinable(object):
@@ -44,6 +81,8 @@ class GnuplotDefinable(object):
         Definition expression of this value.
 
     """
+    __slots__ = ('__name', '__ns')
+
     def __init__(self, ns):
         super(GnuplotDefinable, self).__init__()
         self.__name = None
@@ -86,24 +125,29 @@ class GnuplotFunction(GnuplotDefinable):
         Arity of this function
 
     """
+    __slots__ = ('__args', '__body', '__arity', '__defargs', '__qualname',
+                 '__gnuplot_id')
+
     def __init__(self, ns, args, body):
         super(GnuplotFunction, self).__init__(ns)
         self.__args = args
         self.__body = str(body)
         self.__arity = len(args)
+        self.__defargs = _formatArgs(tuple(args))
+        self.__qualname = None
+        self.__gnuplot_id = None
 
     arity = property(lambda self: self.__arity)
 
-    def __formatArgs(self, args):
-        return ', '.join(map(str, args))
+    def __setName(self, name):
+        # Qualified name and ID are built once, when the function is named
+        self.__qualname = name + self.__defargs
+        self.__gnuplot_id = 'GPFUN_' + name
+        GnuplotDefinable.name.fset(self, name)
 
-    @property
-    def gnuplot_id(self):
-        return 'GPFUN_' + self.name
-
-    @property
-    def qualname(self):
-        return self.name + '(' + self.__formatArgs(self.__args) + ')'
+    name = property(GnuplotDefinable.name.fget, __setName)
+    qualname = property(lambda self: self.__qualname)
+    gnuplot_id = property(lambda self: self.__gnuplot_id)
 
     @property
     def expr(self):
@@ -120,8 +164,7 @@ class GnuplotFunction(GnuplotDefinable):
             The evaluation of this function agains the given arguments
 
         """
-        expr = self.name + '(' + self.__formatArgs(args) + ')'
-        return self.ns.eval(self.gnuplot_id, expr)
+        return self.ns.eval(self.gnuplot_id, self.name + _formatArgs(args))
 
     def pack(self, *args):
         """Return the expression that packs the given args into a call to `self`
@@ -138,7 +181,7 @@ class GnuplotFunction(GnuplotDefinable):
         than those used in the definition.
 
         """
-        return self.name + '(' + self.__formatArgs(args) + ')'
+        return self.name + _formatArgs(args)
 
     def __getitem__(self, args):
         """A shorthand and syntactic sugar for pack
@@ -155,19 +198,21 @@ class GnuplotFunction(GnuplotDefinable):
 
 class GnuplotVariable(GnuplotDefinable):
     """A Gnuplot variable accessible from Python"""
+    __slots__ = ('__value', '__expr')
+
     def __init__(self, ns, value):
         super(GnuplotVariable, self).__init__(ns)
         self.__value = value
+        self.__expr = str(value)
 
-    @property
-    def expr(self):
-        return str(self.__value)
+    expr = property(lambda self: self.__expr)
 
     def __get__(self, instance, owner=None):
         return self.__value
 
 
 class Namespace(dict):
+    __slots__ = ()
 
     def __init__(self, **kwargs):
         super(Namespace, self).__init__()
@@ -176,15 +221,15 @@ class Namespace(dict):
                 name = '_' + type(self).__name__ + name
             super(Namespace, self).__setattr__(name, value)
 
-    def __setattr__(self, name, value):
-        self[name] = value
+    __setattr__ = dict.__setitem__
 
     def __getattr__(self, name):
-        if name in self:
-            obj = self[name]
-            if hasattr(obj, '__get__'):
-                return obj.__get__(self, None)
-            return obj
+        obj = dict.get(self, name, VOID)
+        if obj is not VOID:
+            # Like any descriptor, `__get__` is looked up on the value's type,
+            # a single lookup serves both the test and the call
+            get = getattr(type(obj), '__get__', None)
+            return obj if get is None else get(obj, self, None)
         raise AttributeError("%s has no attribute %s" % \
                              (type(self).__name__, name))
     
@@ -226,17 +271,25 @@ class GnuplotNamespace(Namespace):
     f(a, b)
 
     """
+    __slots__ = ('__context', '__cmd')
+    __EVAL_TEMPLATE = 'if(exists("%s")) printerr %s ; ' \
+                      'else printerr "    line 0: \'%s\' is not defined'
+
     def __init__(self, context):
-        super(GnuplotNamespace, self).__init__(_GnuplotNamespace__context=context)
+        super(GnuplotNamespace, self).__init__(
+            _GnuplotNamespace__context=context,
+            _GnuplotNamespace__cmd=context.cmd)
 
     
     def __setattr__(self, name, value):
+        name = sys.intern(name)
         if value is None:
-            if name in self:
-                self.pop(name).destroy()
+            value = self.pop(name, None)
+            if value is not None:
+                value.destroy()
         else:
             value.name = name
-            super(GnuplotNamespace, self).__setattr__(name, value)
+            dict.__setitem__(self, name, value)
                 
     def eval(self, name, expr):
         """Evaluate an expression inside Gnuplot
@@ -252,16 +305,8 @@ class GnuplotNamespace(Namespace):
             The evaluation's result
 
         """
-        value = self.__context.cmd('if(exists("{name}")) printerr {expr} ; ' \
-                                   'else printerr "    line 0: \'{name}\' is ' \
-                                   'not defined'.format(name=name, expr=expr))
-        if value:
-            if value.isdigit():
-                return int(value)
-            elif isfloat(value):
-                return float(value)
-            return value
-        return None
+        value = self.__cmd(self.__EVAL_TEMPLATE % (name, expr, name))
+        return _parseGnuplotValue(value) if value else None
 
     def define(self, name, expr):
         """Define a value in Gnuplot
@@ -274,7 +319,7 @@ class GnuplotNamespace(Namespace):
             The definition expression
 
         """
-        self.__context.cmd(name + ' = ' + expr)
+        self.__cmd(name + ' = ' + expr)
 
     def undefine(self, name, gnuplot_id):
         """Undefine a value in Gnuplot
@@ -289,7 +334,7 @@ class GnuplotNamespace(Namespace):
             It's Gnuplot ID
 
         """
-        self.__context.cmd('undefine ' + gnuplot_id)
+        self.__cmd('undefine ' + gnuplot_id)
         self.pop(name, None)
 
     def clear(self, timeout=-1):
@@ -301,20 +346,27 @@ class GnuplotNamespace(Namespace):
             `GnuplotContext.defaultTimeout`
 
         """
-        self.__context.send(map(lambda e: 'undefine ' + e[1].gnuplot_id,
-                                self.items()),
-                            timeout=timeout)
+        # `undefine` takes several names, a single command removes them all
+        if self:
+            self.__cmd('undefine ' + ' '.join(value.gnuplot_id
+                                              for value in self.values()),
+                       timeout=timeout)
         super(GnuplotNamespace, self).clear()
 
 class GnuplotVariableNamespace(GnuplotNamespace):
     """A Gnuplot namespace that holds variables"""
+    __slots__ = ()
+
     def __init__(self, context):
         super(GnuplotVariableNamespace, self).__init__(context)
 
     def __setattr__(self, name, value):
-        if value is not None and not isinstance(value, GnuplotDefinable):
+        # Exact type first, that's the common case and the cheapest check
+        if value is None or type(value) is GnuplotVariable:
+            pass
+        elif not isinstance(value, GnuplotDefinable):
             value = GnuplotVariable(self, value)
-        if not isinstance(value, (GnuplotVariable, type(None))):
+        elif not isinstance(value, GnuplotVariable):
             raise TypeError('This namespace is reserved for variable '
                             'definitions, given {}'.format(type(value)))
         super(GnuplotVariableNamespace, self).__setattr__(name, value)
@@ -322,6 +374,8 @@ class GnuplotVariableNamespace(GnuplotNamespace):
 
 class GnuplotFunctionNamespace(GnuplotNamespace):
     """A Gnuplot namespace that holds functions"""
+    __slots__ = ()
+
     def __init__(self, context):
         super(GnuplotFunctionNamespace, self).__init__(context)
 
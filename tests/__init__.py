@@ -20,18 +20,14 @@
 
 import os
 import sys
-import glob
-import inspect
 import doctest
 import unittest
 import importlib
 
-from newplot.variable import Namespace
-
 TESTS_ROOT = os.path.abspath(os.path.dirname(__file__))
 ROOT = os.path.dirname(TESTS_ROOT)
 
-class TestNamespace(Namespace, unittest.TestSuite):
+class TestNamespace(unittest.TestSuite):
     """A testsuite where subtests are reachable from attributes
 
     ex:
@@ -40,63 +36,64 @@ class TestNamespace(Namespace, unittest.TestSuite):
        self.process.GnuplotProcess.wait : the wait method test suite
     """
     def __init__(self, rel_path):
-        super(TestNamespace, self).__init__(__rel_path=rel_path)
+        super(TestNamespace, self).__init__()
+        self.__rel_path = rel_path
+        self.__children = {}
+
+    def __getattr__(self, name):
+        # Only called for missing attributes, private ones are never subtests
+        if not name.startswith('_'):
+            try:
+                return self.__children[name]
+            except KeyError:
+                pass
+        raise AttributeError("%s has no attribute %s" % \
+                             (type(self).__name__, name))
 
-    
     def addTest(self, test):
         prefix_len = len(self.__rel_path)+1
         test_id = test.id()
         test_rel_id = test_id[prefix_len:]
         id_parts = test_rel_id.split('.')
         id_prefix = id_parts[0]
-        if id_prefix in self:
-            self[id_prefix].addTest(test)
+        if id_prefix in self.__children:
+            self.__children[id_prefix].addTest(test)
+            return
         elif id_prefix == test_rel_id:
-            self[id_prefix] = unittest.TestSuite([test])
+            child = unittest.TestSuite([test])
         else:
-            self[id_prefix] = TestNamespace(test_id[:prefix_len+len(id_prefix)])
-            self[id_prefix].addTest(test)
-
-    def addTests(self, tests):
-        for test in tests:
-            self.addTest(test)
-
-    def countTestCases(self):
-        acc = 0
-        for k, v in self.items():
-            if isinstance(v, TestNamespace):
-                acc += v.countTestCases()
-            else:
-                acc += 1
-        return acc
-
-    def run(self, result):
-        for k, v in self.items():
-            v.run(result)
-        return result
-
-    def debug(self):
-        for k, v in self.items():
-            v.debug()
+            child = TestNamespace(test_id[:prefix_len+len(id_prefix)])
+            child.addTest(test)
+        # Subtests are kept as regular suite members too, running, counting
+        # and debugging are left to `unittest.TestSuite`
+        self.__children[id_prefix] = child
+        super(TestNamespace, self).addTest(child)
 
 def load_tests(loader=None, test=None, pattern=None):
     if not ROOT in sys.path:
             sys.path.append(ROOT)
-    newplot = 'gnuplotting'
-    test_paths = glob.iglob(os.path.join(newplot, '**.py'))
-    test_paths = (test_path.replace('.py', '') \
-                  for test_path in test_paths)
+    newplot = 'newplot'
+    # Walk the package for real, '**' only recurses in glob as a whole
+    # path component
+    test_paths = (os.path.join(dir_path, file_name)[:-len('.py')]
+                  for dir_path, dir_names, file_names in \
+                      os.walk(os.path.join(ROOT, newplot))
+                  for file_name in file_names if file_name.endswith('.py'))
+    test_paths = (os.path.relpath(test_path, ROOT) for test_path in test_paths)
     test_module_path_by_names = \
                 ((os.path.basename(test_path.replace(os.sep + '__init__', '')),
                   test_path.replace(os.sep, '.')) for test_path in test_paths)
     test_modules = ((mod_name,
                      importlib.import_module(mod_path, newplot)) \
                         for mod_name, mod_path in test_module_path_by_names)
-    test_modules = ((mod_name, mod) for mod_name, mod in test_modules \
-                    if inspect.getsource(mod).find('"""') > -1)
     doctests = TestNamespace(newplot)
     for name, test_mod in test_modules:
-        test_suite = doctest.DocTestSuite(module=test_mod)
+        # Modules without docstrings give an empty suite, or a ValueError
+        # before Python 3.5
+        try:
+            test_suite = doctest.DocTestSuite(module=test_mod)
+        except ValueError:
+            continue
         doctests.addTests(test_suite)
     return doctests
 